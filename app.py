@@ -5,20 +5,29 @@
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import os
 import json
+import csv
+import asyncio
 from pathlib import Path
 import tempfile
-import base64
+import io
+import html
+import shutil
+import sqlite3
+import logging
+import multiprocessing
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 
-# 导入自定义模块
-from src.pdf_processor import PDFProcessor
-from src.claude_analyzer import ClaudeAnalyzer
+# 导入自定义模块（Plotly与Claude客户端在使用处按需导入）
+from src.pdf_worker import extract_pdf
 from src.database import QuoteDatabase
 
+logger = logging.getLogger(__name__)
+
 
 # ==================== 页面配置 ====================
 st.set_page_config(
@@ -29,7 +38,7 @@ st.set_page_config(
 )
 
 # ==================== 自定义CSS样式 ====================
-st.markdown("""
+_CSS = """
 <style>
     /* 主标题样式 */
     .main-header {
@@ -51,6 +60,16 @@ st.markdown("""
         box-shadow: 0 4px 6px rgba(0,0,0,0.1);
     }
     
+    .metric-row {
+        display: flex;
+        gap: 1rem;
+        margin-bottom: 1.5rem;
+    }
+    
+    .metric-row .metric-card {
+        flex: 1;
+    }
+    
     .metric-card h3 {
         margin: 0;
         font-size: 2rem;
@@ -111,21 +130,133 @@ st.markdown("""
         padding: 2rem;
         text-align: center;
     }
+    
+    /* 报价单卡片网格样式 */
+    .quote-grid {
+        display: grid;
+        grid-template-columns: repeat(3, 1fr);
+        gap: 1rem;
+        margin-bottom: 1rem;
+    }
+    
+    .quote-card {
+        border: 1px solid #ddd;
+        border-radius: 10px;
+        padding: 1rem;
+        background: white;
+    }
+    
+    .quote-card h4 {
+        color: #1f77b4;
+        margin: 0;
+    }
+    
+    .quote-card p {
+        color: #666;
+        font-size: 0.9rem;
+        margin: 0.5rem 0;
+    }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+
+@st.cache_resource
+def _inject_css():
+    """注入自定义样式（缓存命中时由Streamlit回放，无需重复构建）"""
+    st.markdown(_CSS, unsafe_allow_html=True)
+    return True
+
+
+# ==================== 共享资源 ====================
+DEFAULT_DB_PATH = "data/quotes.db"
+
+# 读多写少场景下的SQLite连接参数
+SQLITE_PRAGMAS = """
+PRAGMA synchronous=NORMAL;
+PRAGMA cache_size=-65536;
+PRAGMA mmap_size=268435456;
+PRAGMA temp_store=MEMORY;
+"""
+
+# 列表、筛选、排序常用列的索引
+SQLITE_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_quotes_supplier ON quotes(supplier)",
+    "CREATE INDEX IF NOT EXISTS idx_quotes_processed ON quotes(processed_at DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_quotes_date ON quotes(quote_date DESC)",
+)
+
+
+def tune_sqlite(db, db_path):
+    """启用WAL日志模式、创建常用查询索引，并为数据库连接应用性能参数"""
+    # journal_mode=WAL 与索引均持久化在数据库文件中，对之后打开的所有连接生效
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        for statement in SQLITE_INDEXES:
+            try:
+                conn.execute(statement)
+            except sqlite3.OperationalError as e:
+                # 表结构与预期不符（如缺少对应列）时仅跳过该索引
+                logger.warning("跳过索引创建 [%s]: %s", statement, e)
+        conn.commit()
+    finally:
+        conn.close()
+    
+    # 其余PRAGMA仅作用于当前连接
+    db_conn = getattr(db, 'conn', None)
+    if isinstance(db_conn, sqlite3.Connection):
+        db_conn.executescript(SQLITE_PRAGMAS)
+
+
+def backup_database(db_path, backup_path):
+    """使用SQLite在线备份API复制数据库，分批复制页面，不阻塞其他连接"""
+    source = sqlite3.connect(db_path)
+    try:
+        # 先将WAL中的内容写回主文件
+        source.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        target = sqlite3.connect(backup_path)
+        try:
+            source.backup(target, pages=256)
+        finally:
+            target.close()
+    finally:
+        source.close()
+
+
+@st.cache_resource
+def get_database(db_path=DEFAULT_DB_PATH):
+    """获取数据库实例（所有会话共享）"""
+    db = QuoteDatabase(db_path)
+    try:
+        tune_sqlite(db, db_path)
+    except sqlite3.Error as e:
+        # 性能调优失败（如数据库被锁定、文件只读）不影响正常使用
+        logger.warning("SQLite性能调优失败，使用默认配置: %s", e)
+    return db
+
+
+@st.cache_resource
+def get_pdf_pool():
+    """PDF提取进程池（所有会话共享），子进程启动和模块导入的开销只需支付一次"""
+    # PyMuPDF不支持多线程，使用独立进程并行提取
+    return ProcessPoolExecutor(
+        max_workers=min(8, os.cpu_count() or 1),
+        mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+@st.cache_resource
+def get_analyzer(api_key):
+    """按API密钥获取Claude分析器实例（所有会话共享）"""
+    from src.claude_analyzer import ClaudeAnalyzer
+    return ClaudeAnalyzer(api_key)
 
 
 # ==================== 初始化会话状态 ====================
 def init_session_state():
     """初始化Streamlit会话状态"""
-    if 'pdf_processor' not in st.session_state:
-        st.session_state.pdf_processor = PDFProcessor()
-    
-    if 'claude_analyzer' not in st.session_state:
-        st.session_state.claude_analyzer = None
-    
-    if 'database' not in st.session_state:
-        st.session_state.database = QuoteDatabase()
+    if 'db_path' not in st.session_state:
+        st.session_state.db_path = DEFAULT_DB_PATH
     
     if 'processed_files' not in st.session_state:
         st.session_state.processed_files = []
@@ -158,119 +289,236 @@ def format_date(date_obj):
     return date_obj.strftime("%Y-%m-%d %H:%M")
 
 
-def create_download_link(data, filename, file_label):
-    """创建下载链接"""
-    if isinstance(data, pd.DataFrame):
-        csv = data.to_csv(index=False, encoding='utf-8-sig')
-        b64 = base64.b64encode(csv.encode('utf-8-sig')).decode()
-        href = f'<a href="data:file/csv;base64,{b64}" download="{filename}">{file_label}</a>'
-    else:
-        b64 = base64.b64encode(data.encode()).decode()
-        href = f'<a href="data:file/txt;base64,{b64}" download="{filename}">{file_label}</a>'
-    return href
+def to_csv_bytes(df, chunksize=10000):
+    """将DataFrame分块写入CSV字节（UTF-8 BOM，便于Excel打开）"""
+    buffer = io.BytesIO()
+    df.to_csv(buffer, index=False, encoding='utf-8-sig', chunksize=chunksize)
+    return buffer.getvalue()
+
+
+def records_to_csv_bytes(records):
+    """将字典列表导出为CSV字节（UTF-8 BOM，便于Excel打开）"""
+    fieldnames = list(dict.fromkeys(key for record in records for key in record))
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+    writer.writeheader()
+    writer.writerows(records)
+    return buffer.getvalue().encode('utf-8-sig')
+
+
+# ==================== 数据缓存 ====================
+@st.cache_data(ttl=60, show_spinner=False)
+def _dashboard_stats(_db, version):
+    """仪表板关键指标：总数、总金额、近30天数量、平均金额"""
+    total_quotes = _db.get_total_quotes_count()
+    if not total_quotes:
+        # 空库时无需再查询其余指标
+        return total_quotes, None, 0, None
+    return (
+        total_quotes,
+        _db.get_total_amount(),
+        _db.get_recent_quotes_count(days=30),
+        _db.get_average_quote_amount()
+    )
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _supplier_figure(_db, version):
+    """供应商分布图，无数据时返回None"""
+    supplier_data = _db.get_supplier_statistics()
+    if not supplier_data:
+        return None
+    import plotly.express as px
+    df_suppliers = pd.DataFrame(supplier_data, columns=['供应商', '报价单数量', '总金额'])
+    fig = px.bar(df_suppliers, x='供应商', y='报价单数量', 
+               title='各供应商报价单数量',
+               color='总金额',
+               color_continuous_scale='Blues')
+    fig.update_layout(height=400, uirevision='suppliers')
+    return fig
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _monthly_figure(_db, version):
+    """月度趋势图，无数据时返回None"""
+    monthly_data = _db.get_monthly_statistics()
+    if not monthly_data:
+        return None
+    import plotly.graph_objects as go
+    df_monthly = pd.DataFrame(monthly_data, columns=['月份', '数量', '总金额'])
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=df_monthly['月份'].to_numpy(), y=df_monthly['数量'].to_numpy(),
+                           mode='lines+markers', name='报价单数量',
+                           line=dict(color='#1f77b4', width=3)))
+    fig.update_layout(title='月度报价单趋势', height=400, uirevision='monthly')
+    return fig
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _recent_quotes(_db, version, limit):
+    """最近处理的报价单"""
+    return _db.get_recent_quotes(limit=limit)
+
+
+QUOTE_COLUMNS = ['ID', '文件名', '供应商', '报价日期', '总金额', '项目数量', '处理时间', '状态']
+
+# 报价单表格显示的列：金额、处理时间使用格式化后的显示列，原始列保留用于排序、筛选和导出
+QUOTE_DISPLAY_COLUMNS = ['ID', '文件名', '供应商', '报价日期', '金额显示', '项目数量', '时间显示', '状态']
+
+QUOTE_COLUMN_CONFIG = {
+    "ID": st.column_config.NumberColumn("ID", width="small"),
+    "金额显示": st.column_config.TextColumn("总金额"),
+    "时间显示": st.column_config.TextColumn("处理时间")
+}
+
+
+def with_display_columns(df):
+    """添加金额、处理时间的格式化显示列（与卡片、指标的格式一致）"""
+    return df.assign(**{
+        '金额显示': df['总金额'].map(format_currency, na_action='ignore').fillna("N/A"),
+        '时间显示': df['处理时间'].map(format_date, na_action='ignore').fillna("N/A")
+    })
+
+
+def db_version(db_path):
+    """数据版本标识（数据库绝对路径及数据库、WAL文件的修改时间），作为缓存键使数据变化后缓存自动失效"""
+    # 缓存为进程级共享，键中包含路径，避免修改时间相同的不同数据库互相读取结果
+    mtime = max(
+        (os.stat(path).st_mtime_ns for path in (db_path, db_path + '-wal') if os.path.exists(path)),
+        default=0
+    )
+    return os.path.abspath(db_path), mtime
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _summary_stats(_db, version):
+    """汇总统计：报价单总数、总金额（侧边栏、数据库管理、系统设置共用）"""
+    return _db.get_total_quotes_count(), _db.get_total_amount()
+
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def _all_quotes(_db, version):
+    """全部报价单记录"""
+    return _db.get_all_quotes()
+
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def quotes_dataframe(_db, version):
+    """全部报价单DataFrame（显示列按数据版本只格式化一次）"""
+    return with_display_columns(pd.DataFrame(_all_quotes(_db, version), columns=QUOTE_COLUMNS))
+
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def _supplier_options(_db, version):
+    """报价单中出现的全部供应商"""
+    return tuple(quotes_dataframe(_db, version)['供应商'].unique())
+
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def _quote_detail(_db, quote_id, version):
+    """单个报价单详情"""
+    return _db.get_quote_by_id(quote_id)
+
+
+def invalidate_cache():
+    """数据库写入后清除缓存的查询结果（不影响AI分析缓存）"""
+    for cached_query in (_summary_stats, _dashboard_stats, _supplier_figure, _monthly_figure,
+                         _recent_quotes, _all_quotes, quotes_dataframe, _supplier_options,
+                         _quote_detail, _quote_cards_html):
+        cached_query.clear()
+
+
+# ==================== AI分析 ====================
+@st.cache_data(persist="disk", max_entries=256, show_spinner="🤖 Claude AI 正在分析中...")
+def cached_analyze(text, options, _api_key):
+    """AI分析结果，按文本和提取选项缓存并持久化到磁盘（最多保留256条）"""
+    return get_analyzer(_api_key).analyze_quote(text, **dict(options))
+
+
+async def analyze_batch(analyzer, texts, max_concurrency=8, **options):
+    """并发分析多段文本，结果顺序与输入一致，失败项以异常对象返回"""
+    loop = asyncio.get_running_loop()
+    # 使用独立线程池：默认执行器线程数为 min(32, CPU数+4)，小型主机上达不到设定的并发数
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        return await asyncio.gather(
+            *[loop.run_in_executor(executor, partial(analyzer.analyze_quote, text, **options))
+              for text in texts],
+            return_exceptions=True
+        )
 
 
 # ==================== 页面1: 概览仪表板 ====================
+_METRIC_CARD = (
+    '<div class="metric-card" style="background: linear-gradient(135deg, {gradient});">'
+    '<h3>{value}</h3><p>{label}</p></div>'
+)
+
+
 def page_dashboard():
     """概览仪表板页面"""
     st.markdown('<div class="main-header">📊 概览仪表板</div>', unsafe_allow_html=True)
     
     # 获取统计数据
-    db = st.session_state.database
+    db = get_database(st.session_state.db_path)
+    version = db_version(st.session_state.db_path)
     
     try:
         # 基础统计
-        total_quotes = db.get_total_quotes_count()
-        total_amount = db.get_total_amount()
-        recent_quotes = db.get_recent_quotes_count(days=30)
-        avg_amount = db.get_average_quote_amount()
-        
-        # 显示关键指标
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            st.markdown(f"""
-            <div class="metric-card" style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);">
-                <h3>{total_quotes}</h3>
-                <p>📄 总报价单数</p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col2:
-            st.markdown(f"""
-            <div class="metric-card" style="background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);">
-                <h3>{format_currency(total_amount)}</h3>
-                <p>💰 总金额</p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col3:
-            st.markdown(f"""
-            <div class="metric-card" style="background: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%);">
-                <h3>{recent_quotes}</h3>
-                <p>📅 本月新增</p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col4:
-            st.markdown(f"""
-            <div class="metric-card" style="background: linear-gradient(135deg, #43e97b 0%, #38f9d7 100%);">
-                <h3>{format_currency(avg_amount)}</h3>
-                <p>📊 平均金额</p>
-            </div>
-            """, unsafe_allow_html=True)
+        total_quotes, total_amount, recent_quotes, avg_amount = _dashboard_stats(db, version)
+        
+        # 显示关键指标（一次性渲染全部卡片）
+        cards = [
+            ("#667eea 0%, #764ba2 100%", total_quotes, "📄 总报价单数"),
+            ("#f093fb 0%, #f5576c 100%", format_currency(total_amount), "💰 总金额"),
+            ("#4facfe 0%, #00f2fe 100%", recent_quotes, "📅 本月新增"),
+            ("#43e97b 0%, #38f9d7 100%", format_currency(avg_amount), "📊 平均金额")
+        ]
+        cards_html = "".join(
+            _METRIC_CARD.format(gradient=gradient, value=value, label=label)
+            for gradient, value, label in cards
+        )
+        st.markdown(f'<div class="metric-row">{cards_html}</div>', unsafe_allow_html=True)
         
-        st.markdown("<br>", unsafe_allow_html=True)
+        if not total_quotes:
+            st.info("📭 暂无报价单数据，请先上传和处理PDF文件")
+            if st.button("🔄 刷新数据", key="refresh_dashboard_empty"):
+                invalidate_cache()
+                st.rerun()
+            return
         
         # 图表展示
         col1, col2 = st.columns(2)
         
         with col1:
             st.subheader("📈 供应商分布")
-            supplier_data = db.get_supplier_statistics()
-            if supplier_data:
-                df_suppliers = pd.DataFrame(supplier_data, columns=['供应商', '报价单数量', '总金额'])
-                fig = px.bar(df_suppliers, x='供应商', y='报价单数量', 
-                           title='各供应商报价单数量',
-                           color='总金额',
-                           color_continuous_scale='Blues')
-                fig.update_layout(height=400)
-                st.plotly_chart(fig, use_container_width=True)
+            fig = _supplier_figure(db, version)
+            if fig is not None:
+                st.plotly_chart(fig, use_container_width=True, key="dashboard_suppliers")
             else:
                 st.info("暂无供应商数据")
         
         with col2:
             st.subheader("📊 月度趋势")
-            monthly_data = db.get_monthly_statistics()
-            if monthly_data:
-                df_monthly = pd.DataFrame(monthly_data, columns=['月份', '数量', '总金额'])
-                fig = go.Figure()
-                fig.add_trace(go.Scatter(x=df_monthly['月份'], y=df_monthly['数量'],
-                                       mode='lines+markers', name='报价单数量',
-                                       line=dict(color='#1f77b4', width=3)))
-                fig.update_layout(title='月度报价单趋势', height=400)
-                st.plotly_chart(fig, use_container_width=True)
+            fig = _monthly_figure(db, version)
+            if fig is not None:
+                st.plotly_chart(fig, use_container_width=True, key="dashboard_monthly")
             else:
                 st.info("暂无月度数据")
         
         # 最近处理的报价单
         st.subheader("🕒 最近处理的报价单")
-        recent_data = db.get_recent_quotes(limit=10)
+        recent_data = _recent_quotes(db, version, limit=10)
         
         if recent_data:
-            df_recent = pd.DataFrame(recent_data, columns=[
-                'ID', '文件名', '供应商', '报价日期', '总金额', 
-                '项目数量', '处理时间', '状态'
-            ])
-            df_recent['总金额'] = df_recent['总金额'].apply(lambda x: format_currency(x) if x else 'N/A')
-            df_recent['处理时间'] = df_recent['处理时间'].apply(format_date)
+            df_recent = with_display_columns(pd.DataFrame(recent_data, columns=QUOTE_COLUMNS))
             
             st.dataframe(
                 df_recent,
                 use_container_width=True,
                 hide_index=True,
+                column_order=QUOTE_DISPLAY_COLUMNS,
                 column_config={
-                    "ID": st.column_config.NumberColumn("ID", width="small"),
+                    **QUOTE_COLUMN_CONFIG,
                     "状态": st.column_config.TextColumn("状态", width="small")
                 }
             )
@@ -279,6 +527,7 @@ def page_dashboard():
         
         # 刷新按钮
         if st.button("🔄 刷新数据", key="refresh_dashboard"):
+            invalidate_cache()
             st.rerun()
     
     except Exception as e:
@@ -315,78 +564,107 @@ def page_pdf_processor():
         
         st.markdown("---")
         
-        # 处理选项
-        st.subheader("2️⃣ 处理选项")
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            use_ocr = st.checkbox(
-                "启用OCR (光学字符识别)",
-                value=False,
-                help="如果PDF是扫描件或图片格式，请启用OCR"
-            )
-        
-        with col2:
-            extract_images = st.checkbox(
-                "提取图片",
-                value=False,
-                help="提取PDF中的图片内容"
-            )
-        
-        # 开始处理按钮
-        st.markdown("---")
-        st.subheader("3️⃣ 开始处理")
-        
-        col1, col2, col3 = st.columns([1, 1, 2])
-        with col1:
-            process_button = st.button("🚀 开始处理", type="primary", use_container_width=True)
-        with col2:
-            clear_button = st.button("🗑️ 清除结果", use_container_width=True)
+        # 处理选项（表单内修改选项不会触发重新运行）
+        with st.form("process_form", border=False):
+            st.subheader("2️⃣ 处理选项")
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                use_ocr = st.checkbox(
+                    "启用OCR (光学字符识别)",
+                    value=False,
+                    help="如果PDF是扫描件或图片格式，请启用OCR"
+                )
+            
+            with col2:
+                extract_images = st.checkbox(
+                    "提取图片",
+                    value=False,
+                    help="提取PDF中的图片内容"
+                )
+            
+            # 开始处理按钮
+            st.markdown("---")
+            st.subheader("3️⃣ 开始处理")
+            
+            col1, col2, col3 = st.columns([1, 1, 2])
+            with col1:
+                process_button = st.form_submit_button("🚀 开始处理", type="primary", use_container_width=True)
+            with col2:
+                clear_button = st.form_submit_button("🗑️ 清除结果", use_container_width=True)
         
         if clear_button:
             st.session_state.processed_files = []
             st.rerun()
         
         if process_button:
-            processor = st.session_state.pdf_processor
             progress_bar = st.progress(0)
             status_text = st.empty()
             
-            results = []
+            total_files = len(uploaded_files)
+            results = [None] * total_files
             
-            for idx, uploaded_file in enumerate(uploaded_files):
-                try:
-                    status_text.text(f"正在处理: {uploaded_file.name} ({idx + 1}/{len(uploaded_files)})")
-                    
-                    # 保存临时文件
+            # 先写出全部临时文件，再并发处理
+            # (extract_text_from_pdf 按文件路径读取，无法直接使用内存缓冲)
+            tmp_paths = []
+            futures = {}
+            try:
+                for uploaded_file in uploaded_files:
                     with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-                        tmp_file.write(uploaded_file.read())
-                        tmp_path = tmp_file.name
-                    
-                    # 处理PDF
-                    result = processor.extract_text_from_pdf(
-                        tmp_path,
+                        tmp_paths.append(tmp_file.name)
+                        uploaded_file.seek(0)
+                        shutil.copyfileobj(uploaded_file, tmp_file, length=1 << 20)
+                
+                status_text.text(f"正在处理 {total_files} 个文件...")
+                
+                if total_files == 1:
+                    # 单个文件直接在当前进程提取，无需等待子进程启动
+                    completed = [(0, lambda: extract_pdf(
+                        tmp_paths[0],
                         use_ocr=use_ocr,
                         extract_images=extract_images
-                    )
-                    
-                    result['filename'] = uploaded_file.name
-                    result['file_size'] = uploaded_file.size
-                    result['processed_at'] = datetime.now()
-                    results.append(result)
+                    ))]
+                else:
+                    executor = get_pdf_pool()
+                    futures = {
+                        executor.submit(
+                            extract_pdf,
+                            tmp_path,
+                            use_ocr=use_ocr,
+                            extract_images=extract_images
+                        ): idx
+                        for idx, tmp_path in enumerate(tmp_paths)
+                    }
+                    completed = ((futures[future], future.result) for future in as_completed(futures))
+                
+                for done, (idx, get_result) in enumerate(completed, 1):
+                    uploaded_file = uploaded_files[idx]
+                    try:
+                        result = get_result()
+                        result['filename'] = uploaded_file.name
+                        result['file_size'] = uploaded_file.size
+                        result['processed_at'] = datetime.now()
+                        results[idx] = result
+                    except Exception as e:
+                        if isinstance(e, BrokenProcessPool):
+                            # 子进程异常退出后进程池不可再用，下次处理时重建
+                            get_pdf_pool.clear()
+                        st.error(f"处理 {uploaded_file.name} 时出错: {str(e)}")
+                        results[idx] = {
+                            'filename': uploaded_file.name,
+                            'success': False,
+                            'error': str(e)
+                        }
                     
-                    # 清理临时文件
+                    status_text.text(f"已完成: {uploaded_file.name} ({done}/{total_files})")
+                    progress_bar.progress(done / total_files)
+            finally:
+                # 进程池为共享资源，中途退出（如页面重新运行）时取消尚未开始的任务
+                for future in futures:
+                    future.cancel()
+                # 清理临时文件
+                for tmp_path in tmp_paths:
                     os.unlink(tmp_path)
-                    
-                    progress_bar.progress((idx + 1) / len(uploaded_files))
-                
-                except Exception as e:
-                    st.error(f"处理 {uploaded_file.name} 时出错: {str(e)}")
-                    results.append({
-                        'filename': uploaded_file.name,
-                        'success': False,
-                        'error': str(e)
-                    })
             
             st.session_state.processed_files = results
             status_text.text("✅ 处理完成!")
@@ -452,17 +730,12 @@ def page_ai_analyzer():
         
         if st.button("💾 保存API密钥"):
             st.session_state.api_key = api_key
-            st.session_state.claude_analyzer = ClaudeAnalyzer(api_key)
             st.success("✅ API密钥已保存")
     
     if not st.session_state.api_key:
         st.warning("⚠️ 请先配置API密钥")
         return
     
-    # 初始化分析器
-    if st.session_state.claude_analyzer is None:
-        st.session_state.claude_analyzer = ClaudeAnalyzer(st.session_state.api_key)
-    
     st.markdown("---")
     
     # 选择分析方式
@@ -500,27 +773,28 @@ def page_ai_analyzer():
             height=300,
             placeholder="请粘贴报价单文本内容..."
         )
-        selected_filename = "手动输入_" + datetime.now().strftime("%Y%m%d_%H%M%S")
+        if 'manual_filename' not in st.session_state:
+            st.session_state.manual_filename = "手动输入_" + datetime.now().strftime("%Y%m%d_%H%M%S")
+        selected_filename = st.session_state.manual_filename
     
     else:  # 从数据库选择
-        db = st.session_state.database
-        quotes = db.get_all_quotes()
+        db = get_database(st.session_state.db_path)
+        version = db_version(st.session_state.db_path)
+        df_quotes = quotes_dataframe(db, version)
         
-        if quotes:
-            df_quotes = pd.DataFrame(quotes, columns=[
-                'ID', '文件名', '供应商', '报价日期', '总金额', 
-                '项目数量', '处理时间', '状态'
-            ])
+        if not df_quotes.empty:
+            quote_ids = df_quotes['ID'].tolist()
+            quote_labels = [f"{qid} - {name}" for qid, name in zip(quote_ids, df_quotes['文件名'])]
             
             selected_row = st.selectbox(
                 "选择报价单",
-                options=range(len(df_quotes)),
-                format_func=lambda x: f"{df_quotes.iloc[x]['ID']} - {df_quotes.iloc[x]['文件名']}"
+                options=range(len(quote_ids)),
+                format_func=quote_labels.__getitem__
             )
             
             if selected_row is not None:
-                quote_id = df_quotes.iloc[selected_row]['ID']
-                quote_data = db.get_quote_by_id(quote_id)
+                quote_id = quote_ids[selected_row]
+                quote_data = _quote_detail(db, quote_id, version)
                 
                 if quote_data:
                     text_to_analyze = quote_data.get('original_text', '')
@@ -545,35 +819,121 @@ def page_ai_analyzer():
     st.markdown("---")
     st.subheader("3️⃣ 开始分析")
     
-    if st.button("🚀 开始AI分析", type="primary", disabled=not text_to_analyze):
+    batch_files = [f for f in st.session_state.processed_files if f.get('success') and f.get('text')]
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        analyze_button = st.button("🚀 开始AI分析", type="primary", disabled=not text_to_analyze)
+    with col2:
+        batch_button = st.button(
+            f"📚 批量分析 ({len(batch_files)})",
+            disabled=not batch_files,
+            help="并发分析所有已处理的PDF文件"
+        )
+    
+    if batch_button:
+        with st.spinner(f"🤖 Claude AI 正在批量分析 {len(batch_files)} 个文件..."):
+            analyzer = get_analyzer(st.session_state.api_key)
+            batch_results = asyncio.run(analyze_batch(
+                analyzer,
+                [f['text'] for f in batch_files],
+                extract_supplier=extract_supplier,
+                extract_items=extract_items,
+                extract_pricing=extract_pricing,
+                extract_dates=extract_dates
+            ))
+        
+        analyzed_at = datetime.now()
+        st.session_state.batch_analysis = [
+            {
+                'filename': f['filename'],
+                'text': f['text'],
+                'result': None if isinstance(r, Exception) else r,
+                'error': str(r) if isinstance(r, Exception) else None,
+                'analyzed_at': analyzed_at
+            }
+            for f, r in zip(batch_files, batch_results)
+        ]
+        failed = sum(1 for a in st.session_state.batch_analysis if a['error'])
+        if failed:
+            st.warning(f"⚠️ 批量分析完成，{failed} 个文件分析失败")
+        else:
+            st.success("✅ 批量分析完成!")
+    
+    if analyze_button:
         if not text_to_analyze:
             st.error("❌ 请先选择或输入要分析的内容")
         else:
-            with st.spinner("🤖 Claude AI 正在分析中..."):
-                try:
-                    analyzer = st.session_state.claude_analyzer
-                    
-                    # 调用AI分析
-                    analysis_result = analyzer.analyze_quote(
-                        text_to_analyze,
-                        extract_supplier=extract_supplier,
-                        extract_items=extract_items,
-                        extract_pricing=extract_pricing,
-                        extract_dates=extract_dates
-                    )
-                    
-                    st.session_state.current_analysis = {
-                        'filename': selected_filename,
-                        'text': text_to_analyze,
-                        'result': analysis_result,
-                        'analyzed_at': datetime.now()
-                    }
-                    
-                    st.success("✅ 分析完成!")
-                    st.balloons()
+            try:
+                # 调用AI分析（相同文本和选项直接复用缓存结果）
+                analysis_result = cached_analyze(
+                    text_to_analyze,
+                    (
+                        ('extract_supplier', extract_supplier),
+                        ('extract_items', extract_items),
+                        ('extract_pricing', extract_pricing),
+                        ('extract_dates', extract_dates)
+                    ),
+                    st.session_state.api_key
+                )
                 
-                except Exception as e:
-                    st.error(f"❌ 分析失败: {str(e)}")
+                st.session_state.current_analysis = {
+                    'filename': selected_filename,
+                    'text': text_to_analyze,
+                    'result': analysis_result,
+                    'analyzed_at': datetime.now()
+                }
+                # 下一次手动输入使用新的文件名
+                st.session_state.pop('manual_filename', None)
+                
+                st.success("✅ 分析完成!")
+                st.balloons()
+            
+            except Exception as e:
+                st.error(f"❌ 分析失败: {str(e)}")
+    
+    # 显示批量分析结果
+    if st.session_state.get('batch_analysis'):
+        st.markdown("---")
+        st.subheader("📚 批量分析结果")
+        
+        batch = st.session_state.batch_analysis
+        st.dataframe(
+            pd.DataFrame([
+                {
+                    '文件名': a['filename'],
+                    '供应商': (a['result'] or {}).get('supplier', 'N/A'),
+                    '总金额': format_currency((a['result'] or {}).get('total_amount')),
+                    '状态': f"❌ {a['error']}" if a['error'] else "✅ 成功"
+                }
+                for a in batch
+            ]),
+            use_container_width=True,
+            hide_index=True
+        )
+        
+        if st.button("💾 全部保存到数据库", key="save_batch"):
+            saved = 0
+            try:
+                db = get_database(st.session_state.db_path)
+                for a in batch:
+                    # 已保存的条目跳过，部分失败后重试不会重复写入
+                    if a['result'] is not None and not a.get('saved'):
+                        db.insert_quote(
+                            filename=a['filename'],
+                            original_text=a['text'],
+                            analysis_result=a['result']
+                        )
+                        a['saved'] = True
+                        saved += 1
+                # 全部保存成功后清除批量结果，避免再次点击重复入库
+                st.session_state.pop('batch_analysis', None)
+                st.success(f"✅ 已保存 {saved} 条记录到数据库")
+            except Exception as e:
+                st.error(f"❌ 保存失败: {str(e)}")
+            finally:
+                if saved:
+                    invalidate_cache()
     
     # 显示分析结果
     if st.session_state.current_analysis:
@@ -581,6 +941,8 @@ def page_ai_analyzer():
         st.subheader("4️⃣ 分析结果")
         
         result = st.session_state.current_analysis['result']
+        # 导出文件名使用分析时间，保证多次重新运行间保持一致
+        export_ts = st.session_state.current_analysis['analyzed_at'].strftime('%Y%m%d_%H%M%S')
         
         # 基本信息卡片
         col1, col2, col3 = st.columns(3)
@@ -595,8 +957,7 @@ def page_ai_analyzer():
         # 设备项目列表
         if result.get('items'):
             st.subheader("📦 设备项目清单")
-            items_df = pd.DataFrame(result['items'])
-            st.dataframe(items_df, use_container_width=True, hide_index=True)
+            st.dataframe(result['items'], use_container_width=True, hide_index=True)
         
         # JSON格式查看
         with st.expander("🔍 查看完整JSON结果"):
@@ -609,12 +970,13 @@ def page_ai_analyzer():
         with col1:
             if st.button("💾 保存到数据库", type="primary"):
                 try:
-                    db = st.session_state.database
+                    db = get_database(st.session_state.db_path)
                     quote_id = db.insert_quote(
                         filename=st.session_state.current_analysis['filename'],
                         original_text=st.session_state.current_analysis['text'],
                         analysis_result=result
                     )
+                    invalidate_cache()
                     st.success(f"✅ 已保存到数据库! ID: {quote_id}")
                 except Exception as e:
                     st.error(f"❌ 保存失败: {str(e)}")
@@ -622,12 +984,11 @@ def page_ai_analyzer():
         with col2:
             # 导出为Excel
             if result.get('items'):
-                items_df = pd.DataFrame(result['items'])
-                excel_data = items_df.to_csv(index=False, encoding='utf-8-sig')
+                excel_data = records_to_csv_bytes(result['items'])
                 st.download_button(
                     "📊 导出Excel",
                     excel_data,
-                    file_name=f"analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                    file_name=f"analysis_{export_ts}.csv",
                     mime="text/csv"
                 )
         
@@ -637,28 +998,49 @@ def page_ai_analyzer():
             st.download_button(
                 "📄 导出JSON",
                 json_data,
-                file_name=f"analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                file_name=f"analysis_{export_ts}.json",
                 mime="application/json"
             )
 
 
 # ==================== 页面4: 数据库管理 ====================
+@st.dialog("确认清空所有数据")
+def confirm_clear_data():
+    """清空数据库确认对话框，确认后只执行一次清空"""
+    st.warning("⚠️ 将删除数据库中的所有报价单，此操作不可恢复")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("确认清空", type="primary", use_container_width=True):
+            try:
+                get_database(st.session_state.db_path).clear_all_data()
+                st.session_state.pop('search_results', None)
+                invalidate_cache()
+                st.toast("✅ 数据库已清空")
+                st.rerun()
+            except Exception as e:
+                st.error(f"❌ 清空失败: {str(e)}")
+    with col2:
+        if st.button("取消", use_container_width=True):
+            st.rerun()
+
+
 def page_database():
     """数据库管理页面"""
     st.markdown('<div class="main-header">🗄️ 数据库管理</div>', unsafe_allow_html=True)
     
-    db = st.session_state.database
+    db = get_database(st.session_state.db_path)
+    version = db_version(st.session_state.db_path)
     
     # 数据库统计
     st.subheader("📊 数据库统计")
     col1, col2, col3, col4 = st.columns(4)
+    total, amount = _summary_stats(db, version)
     
     with col1:
-        total = db.get_total_quotes_count()
         st.metric("报价单总数", total)
     
     with col2:
-        amount = db.get_total_amount()
         st.metric("总金额", format_currency(amount))
     
     with col3:
@@ -674,26 +1056,29 @@ def page_database():
     # 数据查询和筛选
     st.subheader("🔍 数据查询")
     
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        search_supplier = st.text_input("供应商名称", placeholder="输入供应商名称...")
-    
-    with col2:
-        date_range = st.date_input(
-            "日期范围",
-            value=(datetime.now() - timedelta(days=90), datetime.now()),
-            help="选择查询的日期范围"
-        )
-    
-    with col3:
-        status_filter = st.selectbox(
-            "状态筛选",
-            ["全部", "待处理", "已完成", "已归档"]
-        )
+    with st.form("search_form", border=False):
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            search_supplier = st.text_input("供应商名称", placeholder="输入供应商名称...")
+        
+        with col2:
+            date_range = st.date_input(
+                "日期范围",
+                value=(datetime.now() - timedelta(days=90), datetime.now()),
+                help="选择查询的日期范围"
+            )
+        
+        with col3:
+            status_filter = st.selectbox(
+                "状态筛选",
+                ["全部", "待处理", "已完成", "已归档"]
+            )
+        
+        # 搜索按钮
+        submitted = st.form_submit_button("🔍 搜索", type="primary")
     
-    # 搜索按钮
-    if st.button("🔍 搜索", type="primary"):
+    if submitted:
         # 执行搜索逻辑
         quotes = db.search_quotes(
             supplier=search_supplier if search_supplier else None,
@@ -705,30 +1090,22 @@ def page_database():
     
     # 显示查询结果
     if 'search_results' in st.session_state:
-        quotes = st.session_state['search_results']
+        df = with_display_columns(pd.DataFrame(st.session_state['search_results'], columns=QUOTE_COLUMNS))
     else:
-        quotes = db.get_all_quotes()
+        df = quotes_dataframe(db, version)
     
-    if quotes:
+    if not df.empty:
         st.markdown("---")
         st.subheader("📋 报价单列表")
         
-        df = pd.DataFrame(quotes, columns=[
-            'ID', '文件名', '供应商', '报价日期', '总金额', 
-            '项目数量', '处理时间', '状态'
-        ])
-        
-        # 格式化显示
-        df['总金额'] = df['总金额'].apply(lambda x: format_currency(x) if x else 'N/A')
-        df['处理时间'] = df['处理时间'].apply(format_date)
-        
-        # 使用dataframe组件显示
+        # 使用dataframe组件显示（金额、时间显示格式化后的列）
         st.dataframe(
             df,
             use_container_width=True,
             hide_index=True,
+            column_order=QUOTE_DISPLAY_COLUMNS,
             column_config={
-                "ID": st.column_config.NumberColumn("ID", width="small"),
+                **QUOTE_COLUMN_CONFIG,
                 "操作": st.column_config.TextColumn("操作", width="small")
             }
         )
@@ -741,7 +1118,7 @@ def page_database():
         
         with col1:
             if st.button("📥 导出全部数据"):
-                csv_data = df.to_csv(index=False, encoding='utf-8-sig')
+                csv_data = to_csv_bytes(df[QUOTE_COLUMNS])
                 st.download_button(
                     "下载CSV文件",
                     csv_data,
@@ -751,30 +1128,26 @@ def page_database():
         
         with col2:
             if st.button("🗑️ 清空数据库"):
-                if st.checkbox("确认清空所有数据（不可恢复）"):
-                    try:
-                        db.clear_all_data()
-                        st.success("✅ 数据库已清空")
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"❌ 清空失败: {str(e)}")
+                confirm_clear_data()
         
         with col3:
             if st.button("🔄 刷新数据"):
+                invalidate_cache()
                 st.rerun()
         
         # 详细查看
         st.markdown("---")
         st.subheader("🔍 详细查看")
         
+        id_to_name = dict(zip(df['ID'].tolist(), df['文件名']))
         selected_id = st.selectbox(
             "选择报价单ID查看详情",
-            options=df['ID'].tolist(),
-            format_func=lambda x: f"ID: {x} - {df[df['ID']==x]['文件名'].values[0]}"
+            options=list(id_to_name),
+            format_func=lambda x: f"ID: {x} - {id_to_name[x]}"
         )
         
         if selected_id:
-            quote_detail = db.get_quote_by_id(selected_id)
+            quote_detail = _quote_detail(db, selected_id, version)
             
             if quote_detail:
                 with st.expander("📄 查看详细信息", expanded=True):
@@ -793,8 +1166,7 @@ def page_database():
                     # 项目列表
                     if quote_detail.get('items'):
                         st.subheader("设备项目")
-                        items_df = pd.DataFrame(quote_detail['items'])
-                        st.dataframe(items_df, use_container_width=True)
+                        st.dataframe(quote_detail['items'], use_container_width=True)
                     
                     # 原始文本
                     if quote_detail.get('original_text'):
@@ -816,6 +1188,7 @@ def page_database():
                         if st.button("🗑️ 删除", key=f"delete_{selected_id}"):
                             try:
                                 db.delete_quote(selected_id)
+                                invalidate_cache()
                                 st.success("✅ 删除成功")
                                 st.rerun()
                             except Exception as e:
@@ -835,11 +1208,84 @@ def page_database():
 
 
 # ==================== 页面5: 结果查看 ====================
+def render_quote_card(quote):
+    """生成单个报价单卡片的HTML（文件名、供应商转义，避免破坏同一网格中的其他卡片）"""
+    return (
+        f'<div class="quote-card">'
+        f'<h4>{html.escape(str(quote[1]))}</h4>'
+        f'<p>供应商: {html.escape(str(quote[2] or "N/A"))}</p>'
+        f'<p>金额: {format_currency(quote[4])}</p>'
+        f'<p>项目: {quote[5]} 个</p>'
+        f'<p style="font-size: 0.8rem;">{format_date(quote[6])}</p>'
+        f'</div>'
+    )
+
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def _quote_cards_html(_db, version):
+    """全部报价单卡片的HTML（金额、时间按数据版本只格式化一次）"""
+    return "\n".join(render_quote_card(quote) for quote in _all_quotes(_db, version))
+
+
+@st.cache_data(show_spinner=False)
+def _comparison_figure(id1, id2, amount1, amount2):
+    """两个报价单的价格对比图"""
+    import plotly.graph_objects as go
+    fig = go.Figure(go.Bar(
+        x=['报价单 1', '报价单 2'],
+        y=[amount1, amount2],
+        marker_color=['#636efa', '#ef553b']
+    ))
+    fig.update_layout(title='价格对比', height=400, uirevision='cmp')
+    return fig
+
+
+@st.fragment
+def _compare_view(quotes):
+    """对比视图，选择变化时只重新运行本视图"""
+    st.subheader("⚖️ 对比视图")
+    
+    # 选择要对比的报价单（列表记录已包含金额、项目数量等汇总字段，无需再查询详情）
+    rows = {q[0]: q for q in quotes}
+    labels = {q[0]: f"{q[0]} - {q[1]}" for q in quotes}
+    quote_ids = list(labels)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        compare1 = st.selectbox("选择报价单 1", options=quote_ids, format_func=labels.get)
+    
+    with col2:
+        compare2 = st.selectbox("选择报价单 2", options=quote_ids, format_func=labels.get, index=min(1, len(quote_ids)-1))
+    
+    if compare1 != compare2:
+        quote1, quote2 = rows[compare1], rows[compare2]
+        
+        # 对比表格（直接渲染为Markdown表格）
+        comparison_rows = [
+            ('供应商', quote1[2] or 'N/A', quote2[2] or 'N/A'),
+            ('报价日期', quote1[3] or 'N/A', quote2[3] or 'N/A'),
+            ('总金额', format_currency(quote1[4]), format_currency(quote2[4])),
+            ('项目数量', quote1[5] or 0, quote2[5] or 0),
+            ('处理时间', format_date(quote1[6]), format_date(quote2[6]))
+        ]
+        table_lines = ["| 项目 | 报价单 1 | 报价单 2 |", "| --- | --- | --- |"]
+        table_lines += [
+            "| " + " | ".join(str(cell).replace("|", "\\|") for cell in row) + " |"
+            for row in comparison_rows
+        ]
+        st.markdown("\n".join(table_lines))
+        
+        # 价格对比图表
+        if quote1[4] and quote2[4]:
+            fig = _comparison_figure(compare1, compare2, quote1[4], quote2[4])
+            st.plotly_chart(fig, use_container_width=True, key=f"cmp_{compare1}_{compare2}")
+
+
 def page_results():
     """结果查看页面"""
     st.markdown('<div class="main-header">📊 结果查看</div>', unsafe_allow_html=True)
     
-    db = st.session_state.database
+    db = get_database(st.session_state.db_path)
     
     # 选择查看方式
     view_mode = st.radio(
@@ -848,7 +1294,8 @@ def page_results():
         horizontal=True
     )
     
-    quotes = db.get_all_quotes()
+    version = db_version(st.session_state.db_path)
+    quotes = _all_quotes(db, version)
     
     if not quotes:
         st.info("📭 暂无数据")
@@ -857,15 +1304,12 @@ def page_results():
     if view_mode == "表格视图":
         st.subheader("📋 表格视图")
         
-        df = pd.DataFrame(quotes, columns=[
-            'ID', '文件名', '供应商', '报价日期', '总金额', 
-            '项目数量', '处理时间', '状态'
-        ])
+        df = quotes_dataframe(db, version)
         
         # 添加筛选器
         col1, col2 = st.columns(2)
         with col1:
-            suppliers = ['全部'] + list(df['供应商'].unique())
+            suppliers = ['全部'] + list(_supplier_options(db, version))
             selected_supplier = st.selectbox("筛选供应商", suppliers)
         
         with col2:
@@ -878,205 +1322,202 @@ def page_results():
         df = df.sort_values(by=sort_by, ascending=False)
         
         # 显示表格
-        df['总金额'] = df['总金额'].apply(lambda x: format_currency(x) if x else 'N/A')
-        st.dataframe(df, use_container_width=True, hide_index=True)
+        st.dataframe(
+            df,
+            use_container_width=True,
+            hide_index=True,
+            column_order=QUOTE_DISPLAY_COLUMNS,
+            column_config=QUOTE_COLUMN_CONFIG
+        )
     
     elif view_mode == "卡片视图":
         st.subheader("🎴 卡片视图")
         
-        # 每行显示3个卡片
-        cols = st.columns(3)
-        
-        for idx, quote in enumerate(quotes):
-            col_idx = idx % 3
-            
-            with cols[col_idx]:
-                with st.container():
-                    st.markdown(f"""
-                    <div style="border: 1px solid #ddd; border-radius: 10px; padding: 1rem; margin-bottom: 1rem; background: white;">
-                        <h4 style="color: #1f77b4; margin: 0;">{quote[1]}</h4>
-                        <p style="color: #666; font-size: 0.9rem; margin: 0.5rem 0;">供应商: {quote[2] or 'N/A'}</p>
-                        <p style="color: #666; font-size: 0.9rem; margin: 0.5rem 0;">金额: {format_currency(quote[4])}</p>
-                        <p style="color: #666; font-size: 0.9rem; margin: 0.5rem 0;">项目: {quote[5]} 个</p>
-                        <p style="color: #666; font-size: 0.8rem; margin: 0.5rem 0;">{format_date(quote[6])}</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    if st.button("查看详情", key=f"view_card_{quote[0]}"):
-                        st.session_state['selected_quote_id'] = quote[0]
-                        st.rerun()
-    
-    else:  # 对比视图
-        st.subheader("⚖️ 对比视图")
-        
-        # 选择要对比的报价单
-        quote_ids = [q[0] for q in quotes]
-        quote_labels = [f"{q[0]} - {q[1]}" for q in quotes]
+        # 每行显示3个卡片，全部卡片一次性渲染
+        cards_html = _quote_cards_html(db, version)
+        st.markdown(f'<div class="quote-grid">\n{cards_html}\n</div>', unsafe_allow_html=True)
         
-        col1, col2 = st.columns(2)
+        col1, col2 = st.columns([3, 1])
         with col1:
-            compare1 = st.selectbox("选择报价单 1", options=quote_ids, format_func=lambda x: quote_labels[quote_ids.index(x)])
-        
+            card_id = st.selectbox(
+                "选择报价单",
+                options=[q[0] for q in quotes],
+                format_func=lambda x: f"ID: {x}",
+                label_visibility="collapsed"
+            )
         with col2:
-            compare2 = st.selectbox("选择报价单 2", options=quote_ids, format_func=lambda x: quote_labels[quote_ids.index(x)], index=min(1, len(quote_ids)-1))
-        
-        if compare1 != compare2:
-            quote1 = db.get_quote_by_id(compare1)
-            quote2 = db.get_quote_by_id(compare2)
-            
-            if quote1 and quote2:
-                # 对比表格
-                comparison_data = {
-                    '项目': ['供应商', '报价日期', '总金额', '项目数量', '处理时间'],
-                    '报价单 1': [
-                        quote1.get('supplier', 'N/A'),
-                        quote1.get('quote_date', 'N/A'),
-                        format_currency(quote1.get('total_amount')),
-                        quote1.get('item_count', 0),
-                        format_date(quote1.get('processed_at'))
-                    ],
-                    '报价单 2': [
-                        quote2.get('supplier', 'N/A'),
-                        quote2.get('quote_date', 'N/A'),
-                        format_currency(quote2.get('total_amount')),
-                        quote2.get('item_count', 0),
-                        format_date(quote2.get('processed_at'))
-                    ]
-                }
-                
-                df_comparison = pd.DataFrame(comparison_data)
-                st.dataframe(df_comparison, use_container_width=True, hide_index=True)
-                
-                # 价格对比图表
-                if quote1.get('total_amount') and quote2.get('total_amount'):
-                    fig = go.Figure(data=[
-                        go.Bar(name='报价单 1', x=['总金额'], y=[quote1['total_amount']]),
-                        go.Bar(name='报价单 2', x=['总金额'], y=[quote2['total_amount']])
-                    ])
-                    fig.update_layout(title='价格对比', height=400)
-                    st.plotly_chart(fig, use_container_width=True)
+            if st.button("查看详情", key="view_card"):
+                st.session_state['selected_quote_id'] = card_id
+                st.rerun()
+    
+    else:  # 对比视图
+        _compare_view(quotes)
 
 
 # ==================== 页面6: 系统设置 ====================
+@st.cache_resource
+def _background_executor():
+    """后台任务线程池（所有会话共享）"""
+    return ThreadPoolExecutor(max_workers=2)
+
+
+@st.fragment(run_every=1)
+def _connection_test_status():
+    """轮询后台连接测试，完成后整页重新运行以显示结果"""
+    future = st.session_state.get('test_future')
+    if future is None:
+        return
+    
+    if future.done():
+        try:
+            future.result()
+            st.session_state.test_result = (True, "✅ 连接成功")
+        except Exception as e:
+            st.session_state.test_result = (False, f"❌ 连接失败: {str(e)}")
+        del st.session_state.test_future
+        st.rerun()
+    else:
+        st.info("⏳ 正在测试连接...")
+
+
 def page_settings():
     """系统设置页面"""
     st.markdown('<div class="main-header">⚙️ 系统设置</div>', unsafe_allow_html=True)
     
-    # API设置
+    # API设置（表单内输入不会逐字触发重新运行）
     st.subheader("🔑 API配置")
     with st.expander("Anthropic API设置", expanded=True):
-        api_key = st.text_input(
-            "API密钥",
-            value=st.session_state.api_key,
-            type="password"
-        )
+        with st.form("api_form", border=False):
+            api_key = st.text_input(
+                "API密钥",
+                value=st.session_state.api_key,
+                type="password"
+            )
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                save_key = st.form_submit_button("💾 保存API密钥")
+            with col2:
+                test_key = st.form_submit_button("🧪 测试连接")
         
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.button("💾 保存API密钥"):
-                st.session_state.api_key = api_key
-                st.session_state.claude_analyzer = ClaudeAnalyzer(api_key)
-                st.success("✅ 已保存")
+        if save_key:
+            st.session_state.api_key = api_key
+            st.success("✅ 已保存")
         
-        with col2:
-            if st.button("🧪 测试连接"):
-                if api_key:
-                    try:
-                        analyzer = ClaudeAnalyzer(api_key)
-                        # 简单测试
-                        result = analyzer.analyze_quote("测试文本", extract_supplier=True)
-                        st.success("✅ 连接成功")
-                    except Exception as e:
-                        st.error(f"❌ 连接失败: {str(e)}")
-                else:
-                    st.error("❌ 请先输入API密钥")
+        if test_key:
+            if api_key:
+                try:
+                    analyzer = get_analyzer(api_key)
+                    # 简单测试，在后台线程中执行，不阻塞页面
+                    st.session_state.test_future = _background_executor().submit(
+                        analyzer.analyze_quote, "测试文本", extract_supplier=True
+                    )
+                    st.session_state.pop('test_result', None)
+                except Exception as e:
+                    st.error(f"❌ 连接失败: {str(e)}")
+            else:
+                st.error("❌ 请先输入API密钥")
+        
+        if 'test_future' in st.session_state:
+            _connection_test_status()
+        elif 'test_result' in st.session_state:
+            succeeded, message = st.session_state.pop('test_result')
+            if succeeded:
+                st.success(message)
+            else:
+                st.error(message)
     
     st.markdown("---")
     
     # 数据库设置
     st.subheader("🗄️ 数据库配置")
     with st.expander("数据库设置", expanded=True):
-        db_path = st.text_input(
-            "数据库路径",
-            value="data/quotes.db",
-            help="SQLite数据库文件路径"
-        )
-        
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            if st.button("🔄 重新连接"):
-                try:
-                    st.session_state.database = QuoteDatabase(db_path)
-                    st.success("✅ 重新连接成功")
-                except Exception as e:
-                    st.error(f"❌ 连接失败: {str(e)}")
-        
-        with col2:
-            if st.button("📊 查看统计"):
-                db = st.session_state.database
-                st.info(f"报价单总数: {db.get_total_quotes_count()}")
-        
-        with col3:
-            if st.button("🗑️ 清空数据"):
-                if st.checkbox("确认清空", key="confirm_clear_settings"):
-                    try:
-                        st.session_state.database.clear_all_data()
-                        st.success("✅ 已清空")
-                    except Exception as e:
-                        st.error(f"❌ 清空失败: {str(e)}")
+        with st.form("db_form", border=False):
+            db_path = st.text_input(
+                "数据库路径",
+                value=st.session_state.db_path,
+                help="SQLite数据库文件路径"
+            )
+            
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                reconnect = st.form_submit_button("🔄 重新连接")
+            with col2:
+                show_stats = st.form_submit_button("📊 查看统计")
+            with col3:
+                clear_data = st.form_submit_button("🗑️ 清空数据")
+        
+        if reconnect:
+            try:
+                get_database.clear()
+                get_database(db_path)
+                st.session_state.db_path = db_path
+                # 旧数据库的查询结果不再有效
+                st.session_state.pop('search_results', None)
+                invalidate_cache()
+                st.success("✅ 重新连接成功")
+            except Exception as e:
+                st.error(f"❌ 连接失败: {str(e)}")
+        
+        if show_stats:
+            db = get_database(st.session_state.db_path)
+            total, _ = _summary_stats(db, db_version(st.session_state.db_path))
+            st.info(f"报价单总数: {total}")
+        
+        if clear_data:
+            confirm_clear_data()
     
     st.markdown("---")
     
     # PDF处理设置
     st.subheader("📄 PDF处理配置")
     with st.expander("PDF处理设置", expanded=True):
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            default_ocr = st.checkbox("默认启用OCR", value=False)
-            default_extract_images = st.checkbox("默认提取图片", value=False)
-        
-        with col2:
-            max_pages = st.number_input("最大处理页数", min_value=1, max_value=1000, value=100)
-            timeout = st.number_input("处理超时(秒)", min_value=10, max_value=300, value=60)
-        
-        if st.button("💾 保存PDF设置"):
-            st.success("✅ 设置已保存")
+        with st.form("pdf_settings_form", border=False):
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                default_ocr = st.checkbox("默认启用OCR", value=False)
+                default_extract_images = st.checkbox("默认提取图片", value=False)
+            
+            with col2:
+                max_pages = st.number_input("最大处理页数", min_value=1, max_value=1000, value=100)
+                timeout = st.number_input("处理超时(秒)", min_value=10, max_value=300, value=60)
+            
+            if st.form_submit_button("💾 保存PDF设置"):
+                st.success("✅ 设置已保存")
     
     st.markdown("---")
     
     # 显示设置
     st.subheader("🎨 显示设置")
     with st.expander("界面显示设置", expanded=True):
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            theme = st.selectbox("主题", ["浅色", "深色", "自动"])
-            language = st.selectbox("语言", ["中文", "English"])
-        
-        with col2:
-            items_per_page = st.number_input("每页显示数量", min_value=10, max_value=100, value=20)
-            chart_height = st.number_input("图表高度", min_value=300, max_value=800, value=400)
-        
-        if st.button("💾 保存显示设置"):
-            st.success("✅ 设置已保存")
+        with st.form("display_settings_form", border=False):
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                theme = st.selectbox("主题", ["浅色", "深色", "自动"])
+                language = st.selectbox("语言", ["中文", "English"])
+            
+            with col2:
+                items_per_page = st.number_input("每页显示数量", min_value=10, max_value=100, value=20)
+                chart_height = st.number_input("图表高度", min_value=300, max_value=800, value=400)
+            
+            if st.form_submit_button("💾 保存显示设置"):
+                st.success("✅ 设置已保存")
     
     st.markdown("---")
     
     # 系统信息
     st.subheader("ℹ️ 系统信息")
     with st.expander("查看系统信息", expanded=True):
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.write("**应用版本:** 1.0.0")
-            st.write("**Python版本:**", "3.9+")
-            st.write("**Streamlit版本:**", st.__version__)
-        
-        with col2:
-            st.write("**数据库类型:** SQLite")
-            st.write("**AI模型:** Claude")
-            st.write("**PDF引擎:** PyMuPDF")
+        st.markdown("  \n".join([
+            "**应用版本:** 1.0.0",
+            "**Python版本:** 3.9+",
+            f"**Streamlit版本:** {st.__version__}",
+            "**数据库类型:** SQLite",
+            "**AI模型:** Claude",
+            "**PDF引擎:** PyMuPDF"
+        ]))
     
     st.markdown("---")
     
@@ -1090,7 +1531,9 @@ def page_settings():
             if st.button("📥 创建备份"):
                 try:
                     backup_name = f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
-                    st.info(f"备份已创建: {backup_name}")
+                    backup_path = os.path.join(os.path.dirname(st.session_state.db_path), backup_name)
+                    backup_database(st.session_state.db_path, backup_path)
+                    st.success(f"✅ 备份已创建: {backup_path}")
                 except Exception as e:
                     st.error(f"❌ 备份失败: {str(e)}")
         
@@ -1131,11 +1574,55 @@ def page_settings():
     """)
 
 
+# ==================== 侧边栏 ====================
+@st.fragment
+def sidebar_status():
+    """侧边栏快速统计与系统状态，统计结果按数据版本缓存"""
+    # 快速统计
+    st.markdown("### 📊 快速统计")
+    try:
+        db = get_database(st.session_state.db_path)
+        total, amount = _summary_stats(db, db_version(st.session_state.db_path))
+        st.metric("报价单总数", total)
+        st.metric("总金额", format_currency(amount))
+    except:
+        st.info("统计数据加载中...")
+    
+    # 片段内的按钮点击本身即会重新运行该片段
+    st.button("🔄 刷新统计", key="refresh_sidebar_stats")
+    
+    st.markdown("---")
+    
+    # 系统状态
+    api_status = "🟢 已配置" if st.session_state.api_key else "🔴 未配置"
+    try:
+        db_status = "🟢 正常" if get_database(st.session_state.db_path) else "🔴 异常"
+    except:
+        db_status = "🔴 异常"
+    st.markdown("\n\n".join([
+        "### 🔧 系统状态",
+        f"API: {api_status}",
+        f"数据库: {db_status}"
+    ]))
+
+
+# ==================== 页面路由 ====================
+PAGES = {
+    "📊 概览仪表板": page_dashboard,
+    "📄 PDF处理中心": page_pdf_processor,
+    "🤖 AI分析界面": page_ai_analyzer,
+    "🗄️ 数据库管理": page_database,
+    "📈 结果查看": page_results,
+    "⚙️ 系统设置": page_settings
+}
+
+
 # ==================== 主应用 ====================
 def main():
     """主应用入口"""
     # 初始化
     init_session_state()
+    _inject_css()
     
     # 侧边栏导航
     with st.sidebar:
@@ -1143,46 +1630,14 @@ def main():
         
         page = st.radio(
             "选择功能",
-            [
-                "📊 概览仪表板",
-                "📄 PDF处理中心",
-                "🤖 AI分析界面",
-                "🗄️ 数据库管理",
-                "📈 结果查看",
-                "⚙️ 系统设置"
-            ],
+            list(PAGES),
             label_visibility="collapsed"
         )
         
         st.markdown("---")
         
-        # 快速统计
-        st.markdown("### 📊 快速统计")
-        try:
-            db = st.session_state.database
-            total = db.get_total_quotes_count()
-            amount = db.get_total_amount()
-            
-            st.metric("报价单总数", total)
-            st.metric("总金额", format_currency(amount))
-        except:
-            st.info("统计数据加载中...")
-        
-        st.markdown("---")
-        
-        # 系统状态
-        st.markdown("### 🔧 系统状态")
-        
-        # API状态
-        api_status = "🟢 已配置" if st.session_state.api_key else "🔴 未配置"
-        st.write(f"API: {api_status}")
-        
-        # 数据库状态
-        try:
-            db_status = "🟢 正常" if st.session_state.database else "🔴 异常"
-        except:
-            db_status = "🔴 异常"
-        st.write(f"数据库: {db_status}")
+        # 快速统计与系统状态
+        sidebar_status()
         
         st.markdown("---")
         
@@ -1196,18 +1651,7 @@ def main():
         """, unsafe_allow_html=True)
     
     # 路由到对应页面
-    if page == "📊 概览仪表板":
-        page_dashboard()
-    elif page == "📄 PDF处理中心":
-        page_pdf_processor()
-    elif page == "🤖 AI分析界面":
-        page_ai_analyzer()
-    elif page == "🗄️ 数据库管理":
-        page_database()
-    elif page == "📈 结果查看":
-        page_results()
-    elif page == "⚙️ 系统设置":
-        page_settings()
+    PAGES[page]()
 
 
 # ==================== 运行应用 ====================
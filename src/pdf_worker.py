@@ -0,0 +1,20 @@
+"""
+PDF批量提取的子进程工作函数
+PyMuPDF不支持多线程，批量处理时每个子进程使用各自的PDFProcessor
+"""
+
+from src.pdf_processor import PDFProcessor
+
+_processor = None
+
+
+def extract_pdf(pdf_path, use_ocr=False, extract_images=False):
+    """在当前进程中提取PDF文本，同一进程内复用PDFProcessor"""
+    global _processor
+    if _processor is None:
+        _processor = PDFProcessor()
+    return _processor.extract_text_from_pdf(
+        pdf_path,
+        use_ocr=use_ocr,
+        extract_images=extract_images
+    )